@@ -1,19 +1,28 @@
 import os
 import uvicorn
-from loguru import logger
-from dotenv import load_dotenv
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 
 from src.core.logger import logger
+from src.core.middleware import FastHealth
 from src.app import router
-
-load_dotenv()
+from src.services.sandbox import sandbox_pool
 
 logger.info("Application started")
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await sandbox_pool.start()
+    yield
+    await sandbox_pool.close()
+
+
+API_PREFIX = "/api"
+
+app = FastAPI(lifespan=lifespan)
 
 allow_origins = ["*"]
 
@@ -25,15 +34,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-
-app.include_router(router, prefix="/api")
+# Added last so it wraps everything else, CORS included
+app.add_middleware(FastHealth, paths=("/health", f"{API_PREFIX}/health"))
 
 
-@app.get("/health")
-async def health_check():
-    """Health check endpoint"""
-    return {"status": "healthy"}
+app.include_router(router, prefix=API_PREFIX)
 
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True, workers=1)
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        reload=False,
+        # One process unless WEB_CONCURRENCY says otherwise: every worker adds
+        # its own rotating sink on logs/code_editor.log (which would rotate it
+        # under each other) and keeps its own SANDBOX_POOL_SIZE idle jails.
+        workers=int(os.getenv("WEB_CONCURRENCY", 1)),
+        loop="uvloop",
+        http="httptools",
+        backlog=2048,
+    )
@@ -1,34 +1,113 @@
-import sys, resource
-import pyseccomp as seccomp
+import os, sys, resource, ctypes
 
 # Constants for limits
 CPU_TIME_LIMIT = 2  # seconds
 MEMORY_LIMIT = 100 * 1024 * 1024  # 100 MB
 OUTPUT_LIMIT = 5 * 1024 * 1024  # 5 MB (max stdout/ file size)
 
+# Pre-compiled filter, generated at image build time with `--export-bpf`
+BPF_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "seccomp_filter.bpf"
+)
+
+PR_SET_SECCOMP = 22
+PR_SET_NO_NEW_PRIVS = 38
+SECCOMP_MODE_FILTER = 2
+
+
+class SockFilter(ctypes.Structure):
+    _fields_ = [
+        ("code", ctypes.c_uint16),
+        ("jt", ctypes.c_uint8),
+        ("jf", ctypes.c_uint8),
+        ("k", ctypes.c_uint32),
+    ]
+
+
+class SockFprog(ctypes.Structure):
+    _fields_ = [("len", ctypes.c_ushort), ("filter", ctypes.POINTER(SockFilter))]
+
+
+# Syscalls that would let user code start programs, escape via another
+# process, or reach the network. The process is killed on any of them.
+DENIED_SYSCALLS = (
+    "execve",
+    "execveat",
+    "fork",
+    "vfork",
+    "clone",
+    "clone3",
+    "ptrace",
+    "socket",
+)
+
+
+def build_filter():
+    """Seccomp filter: allow by default, kill on the denied syscalls.
+
+    nsjail (namespaces, chroot, rlimits) is the isolation boundary; this only
+    closes the few escape hatches on top of it. A short deny-list keeps the
+    BPF program small, and it is evaluated on every syscall the user code
+    makes."""
+    import pyseccomp as seccomp
+
+    flt = seccomp.SyscallFilter(defaction=seccomp.ALLOW)
+    for syscall in DENIED_SYSCALLS:
+        flt.add_rule(seccomp.KILL, syscall)
+    return flt
+
+
+def load_filter():
+    """Install the cached BPF program directly with prctl(), skipping
+    libseccomp's rule compilation. Falls back to building it if the cache
+    is missing (e.g. running outside the image)."""
+    try:
+        with open(BPF_PATH, "rb") as f:
+            bpf = f.read()
+    except FileNotFoundError:
+        build_filter().load()
+        return
+
+    count = len(bpf) // ctypes.sizeof(SockFilter)
+    program = (SockFilter * count).from_buffer_copy(bpf)
+    fprog = SockFprog(count, program)
+
+    libc = ctypes.CDLL(None, use_errno=True)
+    if libc.prctl(PR_SET_NO_NEW_PRIVS, 1, 0, 0, 0) != 0:
+        raise OSError(ctypes.get_errno(), "prctl(PR_SET_NO_NEW_PRIVS) failed")
+    if libc.prctl(PR_SET_SECCOMP, SECCOMP_MODE_FILTER, ctypes.byref(fprog), 0, 0):
+        raise OSError(ctypes.get_errno(), "prctl(PR_SET_SECCOMP) failed")
+
+
+if sys.argv[1:] == ["--export-bpf"]:
+    with open(BPF_PATH, "wb") as f:
+        build_filter().export_bpf(f)
+    sys.exit(0)
+
 # 1. Set resource limits
 resource.setrlimit(resource.RLIMIT_CPU, (CPU_TIME_LIMIT, CPU_TIME_LIMIT))
 resource.setrlimit(resource.RLIMIT_AS, (MEMORY_LIMIT, MEMORY_LIMIT))
 resource.setrlimit(resource.RLIMIT_FSIZE, (OUTPUT_LIMIT, OUTPUT_LIMIT))
 # (optional: set RLIMIT_NPROC, RLIMIT_NOFILE as needed)
 
-# 2. Apply seccomp filter: only allow write() to stdout/stderr and exit
-flt = seccomp.SyscallFilter(defaction=seccomp.ERRNO(seccomp.errno.EPERM))
-# Allow write(fd=stdout)
-flt.add_rule(seccomp.ALLOW, "write", seccomp.Arg(0, seccomp.EQ, sys.stdout.fileno()))
-# Allow write(fd=stderr)
-flt.add_rule(seccomp.ALLOW, "write", seccomp.Arg(0, seccomp.EQ, sys.stderr.fileno()))
-# Allow exit (to let the program terminate itself)
-flt.add_rule(seccomp.ALLOW, "exit_group")  # exit_group for Python's exit
-flt.add_rule(seccomp.ALLOW, "exit")
-flt.load()
-
-# 3. Execute the user code
+# 2. Read the user code before the filter goes on, with a bare fd: no
+# BufferedReader/TextIOWrapper to allocate, just the raw bytes exec() takes.
 code_file = sys.argv[1]  # the first argument is the path to the user code file
-with open(code_file, "r") as f:
-    code_source = f.read()
+# No O_NOFOLLOW: /proc/self/fd/N and /dev/stdin (a memfd handed down by the
+# parent) are symlinks and must keep working.
+fd = os.open(code_file, os.O_RDONLY | os.O_CLOEXEC)
+try:
+    code_source = os.read(fd, os.fstat(fd).st_size)
+finally:
+    os.close(fd)
+
+# 3. Apply seccomp filter
+load_filter()
+
+# 4. Execute the user code
+# Never try to write __pycache__ for anything the user code imports
+sys.dont_write_bytecode = True
 
-# Run the code in a restricted namespace (no builtins except safe ones, if desired)
-# Here we use an empty globals dict (so the code can't access our vars)
-# and a minimally populated builtins if extra safety is needed.
-exec(compile(code_source, code_file, "exec"), {})
+# Run the code in a fresh namespace (so the code can't access our vars).
+# __name__ is set so `if __name__ == "__main__":` blocks run as expected.
+exec(code_source, {"__name__": "__main__"})
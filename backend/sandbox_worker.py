@@ -0,0 +1,34 @@
+import sys, resource, types
+
+# Pre-warmed executor spawned by SandboxPool inside nsjail. The interpreter
+# start-up has already been paid by the time a request arrives; we simply
+# block on stdin until the API hands us a job.
+#
+# Job framing: first line is the CPU time limit in seconds, the remainder of
+# stdin (until EOF) is the user code.
+timeout = int(sys.stdin.readline())
+code_source = sys.stdin.read()
+
+resource.setrlimit(resource.RLIMIT_CPU, (timeout, timeout))
+
+# Run the code as a real __main__, the way `python3 -` would: a fresh module
+# registered in sys.modules (so pickle & co. resolve user classes) and neither
+# this file's globals nor its path visible to the user.
+main = types.ModuleType("__main__")
+main.__file__ = "<stdin>"
+main.__cached__ = None
+main.__annotations__ = {}
+main.__builtins__ = __builtins__
+sys.modules["__main__"] = main
+sys.argv = ["-"]
+sys.path[0] = ""  # not this file's directory, i.e. the server's own modules
+
+try:
+    exec(compile(code_source, "<stdin>", "exec"), main.__dict__)
+except SystemExit:
+    raise
+except BaseException as e:
+    # Drop this file's frame so the traceback starts at the user code
+    tb = e.__traceback__.tb_next if e.__traceback__ else None
+    sys.excepthook(type(e), e.with_traceback(tb), tb)
+    sys.exit(1)
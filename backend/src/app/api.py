@@ -1,145 +1,145 @@
 import os
 import uuid
+import asyncio
 import tempfile
-import subprocess
 from fastapi import APIRouter
 from fastapi import HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import Response
+from pydantic import TypeAdapter
 from src.settings import logger
 from src.app.schema import CodeRequest, CodeResponse
 from src.services.user_group import UNPRIVILEGED_GROUP, UNPRIVILEGED_USER
+from src.services.sandbox import (
+    NSJAIL_PATH,
+    SPAWN_KWARGS,
+    decode_output,
+    run_once,
+    sandbox_pool,
+)
 
 router = APIRouter()
 
+code_response_adapter = TypeAdapter(CodeResponse)
+
+
+def code_response(output: str, error: str, exit_code: int) -> Response:
+    """Serialize a CodeResponse to JSON bytes once, in pydantic-core.
+
+    Returning a Response bypasses FastAPI's response_model round-trip
+    (dump, re-validate, encode), which copies outputs of up to
+    OUTPUT_LIMIT_MB several times over.
+    """
+    body = CodeResponse(output=output, error=error, exit_code=exit_code)
+    return Response(
+        code_response_adapter.dump_json(body), media_type="application/json"
+    )
+
 
 @router.post("/execute", response_model=CodeResponse)
 async def execute_code(request: CodeRequest):
-    logger.info("Received code execution request")
+    logger.debug("Received code execution request")
 
     # Create unique ID for this execution
     execution_id = str(uuid.uuid4())
 
     try:
-        with tempfile.TemporaryDirectory() as temp_dir:
-            file_path = os.path.join(temp_dir, f"{execution_id}.py")
-            with open(file_path, "w") as f:
-                f.write(request.code)
+        if sandbox_pool.size:
+            logger.info("Executing code with ID: {} on pooled worker", execution_id)
+            stdout, stderr, exit_code = await sandbox_pool.run(
+                request.code, request.timeout
+            )
+        else:
+            logger.info("Executing code with ID: {}", execution_id)
+            stdout, stderr, exit_code = await run_once(request.code, request.timeout)
+
+        if exit_code == -1:
+            logger.warning("Code execution timed out")
+        else:
+            logger.info("Code execution completed with exit code: {}", exit_code)
+            if stderr:
+                logger.debug("stderr: {}", stderr)
+        return code_response(stdout, stderr, exit_code)
+
+    except Exception as e:
+        logger.error("Error executing code: {}", e)
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@router.get("/test")
+async def test_endpoint():
+    """Simple test endpoint that executes a hello world program"""
+    test_code = 'print("Hello, World!")'
+    try:
+        with tempfile.NamedTemporaryFile(suffix=".py") as temp:
+            temp.write(test_code.encode())
+            temp.flush()
+            temp_path = temp.name
 
             nsjail_cmd = [
-                "nsjail",
+                NSJAIL_PATH,
                 "--quiet",
                 "--mode",
-                "o",  # Once-only mode
+                "o",
                 "--time_limit",
-                str(request.timeout),
-                "--rlimit_cpu",
-                str(request.timeout),
-                "--rlimit_as",
-                "100",  # space limit in MB
+                "5",
                 "--chroot",
                 "/",
                 "--cwd",
-                temp_dir,
+                os.path.dirname(temp_path),
                 "--user",
                 UNPRIVILEGED_USER,
                 "--group",
                 UNPRIVILEGED_GROUP,
-                "--disable_proc",
-                "--iface_no_lo",
                 "--",
                 "/usr/bin/python3",
-                file_path,
+                temp_path,
             ]
 
-            # Execute the code using nsjail
-            logger.info(f"Executing code with ID: {execution_id}")
-            logger.debug(f"nsjail command: {' '.join(nsjail_cmd)}")
-
-            process = subprocess.Popen(
-                nsjail_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
-            )
-
+            # Run Python directly (to check Python itself works) and under
+            # nsjail side by side, the two probes are independent
+            probes = []
             try:
-                stdout, stderr = process.communicate(timeout=request.timeout + 1)
-                exit_code = process.returncode
-
-                logger.info(f"Code execution completed with exit code: {exit_code}")
-                if stderr:
-                    logger.debug(f"stderr: {stderr}")
-
-            except subprocess.TimeoutExpired:
-                process.kill()
-                stdout, stderr = "", "Execution timed out"
-                exit_code = -1
-                logger.warning("Code execution timed out")
-
-            return CodeResponse(output=stdout, error=stderr, exit_code=exit_code)
-
-    except Exception as e:
-        logger.error(f"Error executing code: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
-
-
-@router.get("/test")
-async def test_endpoint():
-    """Simple test endpoint that executes a hello world program"""
-    test_code = 'print("Hello, World!")'
-    try:
-        with tempfile.NamedTemporaryFile(suffix=".py", delete=False) as temp:
-            temp_path = temp.name
-            temp.write(test_code.encode())
-
-        # Execute Python directly without nsjail first to check Python works
-        process = subprocess.run(
-            ["/usr/bin/python3", temp_path], capture_output=True, text=True, timeout=5
-        )
-
-        python_stdout = process.stdout
-        python_stderr = process.stderr
-        python_exit = process.returncode
-
-        nsjail_cmd = [
-            "nsjail",
-            "--quiet",
-            "--mode",
-            "o",
-            "--time_limit",
-            "5",
-            "--chroot",
-            "/",
-            "--cwd",
-            os.path.dirname(temp_path),
-            "--user",
-            UNPRIVILEGED_USER,
-            "--group",
-            UNPRIVILEGED_GROUP,
-            "--",
-            "/usr/bin/python3",
-            temp_path,
-        ]
-
-        process = subprocess.run(nsjail_cmd, capture_output=True, text=True, timeout=6)
-
-        os.unlink(temp_path)
-
+                for cmd in (("/usr/bin/python3", temp_path), nsjail_cmd):
+                    probes.append(
+                        await asyncio.create_subprocess_exec(
+                            *cmd,
+                            stdout=asyncio.subprocess.PIPE,
+                            stderr=asyncio.subprocess.PIPE,
+                            **SPAWN_KWARGS,
+                        )
+                    )
+                python_proc, nsjail_proc = probes
+                python_out, nsjail_out = await asyncio.wait_for(
+                    asyncio.gather(
+                        python_proc.communicate(), nsjail_proc.communicate()
+                    ),
+                    6,
+                )
+            except BaseException as e:
+                # Timed out, cancelled or failed to spawn the second probe:
+                # don't leave the first one running
+                for process in probes:
+                    if process.returncode is None:
+                        process.kill()
+                        await process.wait()
+                if isinstance(e, asyncio.TimeoutError):
+                    return {"error": "Test execution timed out"}
+                raise
+
+        python_stdout, python_stderr = python_out
+        nsjail_stdout, nsjail_stderr = nsjail_out
         return {
             "python_direct": {
-                "stdout": python_stdout,
-                "stderr": python_stderr,
-                "exit_code": python_exit,
+                "stdout": decode_output(python_stdout),
+                "stderr": decode_output(python_stderr),
+                "exit_code": python_proc.returncode,
             },
             "nsjail": {
-                "stdout": process.stdout,
-                "stderr": process.stderr,
-                "exit_code": process.returncode,
+                "stdout": decode_output(nsjail_stdout),
+                "stderr": decode_output(nsjail_stderr),
+                "exit_code": nsjail_proc.returncode,
             },
             "config": {"user": UNPRIVILEGED_USER, "group": UNPRIVILEGED_GROUP},
         }
     except Exception as e:
         return {"error": str(e)}
-
-
-@router.get("/health")
-async def health_check():
-    """Health check endpoint to verify the service is running"""
-    return {"status": "healthy"}
@@ -1,9 +1,12 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
+from src.core.constants import MAX_TIMEOUT
 
 
 class CodeRequest(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
     code: str
-    timeout: int = 5  # Default timeout in seconds
+    timeout: int = Field(5, ge=1, le=MAX_TIMEOUT)  # Default timeout in seconds
 
 
 class CodeResponse(BaseModel):
@@ -0,0 +1,6 @@
+# Upper bound on what a sandboxed program may write to stdout / stderr, in MB.
+# Enforced with RLIMIT_FSIZE on the capture files.
+OUTPUT_LIMIT_MB = 5
+
+# Longest per-request execution timeout a client may ask for, in seconds.
+MAX_TIMEOUT = 30
@@ -1,11 +1,20 @@
-import os
+import sys
 from loguru import logger
+from src.settings import LOG_LEVEL
 
-LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
-
+# Replace loguru's default DEBUG stderr sink so LOG_LEVEL applies to it too;
+# otherwise every debug record is still formatted for the console. Enqueued
+# like the file sink: under Docker stderr is a pipe that can block.
+logger.remove()
+logger.add(sys.stderr, level=LOG_LEVEL, enqueue=True)
 logger.add(
     "logs/code_editor.log",
     rotation="50 MB",
     level=LOG_LEVEL,
     format="{time:YYYY-MM-DD at HH:mm:ss} | {level} | {message}",
+    # Hand records to a background thread so file writes and rotation don't
+    # run on the event loop, and skip stack introspection for plain records.
+    enqueue=True,
+    backtrace=False,
+    diagnose=False,
 )
@@ -0,0 +1,35 @@
+class FastHealth:
+    """ASGI middleware answering GET/HEAD health probes on `paths` before
+    routing.
+
+    Mounted outermost so probes skip CORS handling and FastAPI's router; the
+    response is a constant pre-encoded body.
+    """
+
+    body = b'{"status":"healthy"}'
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+    ]
+
+    def __init__(self, app, paths):
+        self.app = app
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] == "http"
+            and scope["path"] in self.paths
+            and scope["method"] in ("GET", "HEAD")
+        ):
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 200,
+                    "headers": self.headers,
+                }
+            )
+            body = b"" if scope["method"] == "HEAD" else self.body
+            await send({"type": "http.response.body", "body": body})
+            return
+        await self.app(scope, receive, send)
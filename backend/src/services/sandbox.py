@@ -0,0 +1,308 @@
+import asyncio
+import collections
+import os
+import shutil
+import tempfile
+from src.core.constants import MAX_TIMEOUT, OUTPUT_LIMIT_MB
+from src.settings import logger, SANDBOX_POOL_SIZE
+from src.services.user_group import UNPRIVILEGED_GROUP, UNPRIVILEGED_USER
+
+SANDBOX_WORKER = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "sandbox_worker.py",
+)
+
+# Jobs are written to the worker's stdin in one go; a 1 MiB pipe (the default
+# fs.pipe-max-size) takes typical submissions without a round-trip per 64 KiB.
+JOB_PIPE_SIZE = 1 << 20
+
+
+def decode_output(data: bytes) -> str:
+    """Decode a child's raw output in one pass; user programs may emit
+    invalid UTF-8, which must not fail the request."""
+    return data.decode("utf-8", "replace")
+
+
+def read_output(spool) -> str:
+    """Read back a capture file filled by a sandboxed child and close it."""
+    with spool:
+        spool.seek(0)
+        return decode_output(spool.read(OUTPUT_LIMIT_MB << 20))
+
+
+def open_capture():
+    """Open a (stdout, stderr) pair of capture files for a sandboxed child.
+
+    Output goes straight to files so the child never blocks on a full pipe
+    while nobody is reading; RLIMIT_FSIZE bounds their size."""
+    return tempfile.TemporaryFile(), tempfile.TemporaryFile()
+
+
+# Absolute path so Popen can take its posix_spawn() fast path (it skips it for
+# bare names that would need a PATH search).
+NSJAIL_PATH = shutil.which("nsjail") or "/usr/bin/nsjail"
+
+# Minimal environment for sandbox processes: keeps API secrets (PG_* etc.) out
+# of the child and gives execve() a tiny envp to copy.
+SANDBOX_ENV = {"PATH": "/usr/bin", "LC_ALL": "C"}
+
+# Our own fds are non-inheritable (PEP 446), so there is nothing to close in
+# the child; close_fds=True would also rule out posix_spawn().
+SPAWN_KWARGS = {"close_fds": False, "env": SANDBOX_ENV}
+
+# nsjail options shared by every sandbox we start; callers append the limits
+# that vary and the command to run.
+NSJAIL_BASE = (
+    NSJAIL_PATH,
+    "--quiet",
+    "--mode",
+    "o",  # Once-only mode
+    "--rlimit_as",
+    "100",  # space limit in MB
+    "--rlimit_fsize",
+    str(OUTPUT_LIMIT_MB),
+    "--chroot",
+    "/",
+    "--cwd",
+    "/tmp",
+    "--user",
+    UNPRIVILEGED_USER,
+    "--group",
+    UNPRIVILEGED_GROUP,
+    "--disable_proc",
+    "--iface_no_lo",
+)
+
+# Workers may sit idle before their job, so the per-job wall clock is enforced
+# by the pool; nsjail's limit is only a backstop that reaps any jail the pool
+# lost track of. Idle workers are recycled after WORKER_MAX_IDLE, which still
+# leaves room for the longest job before nsjail's limit.
+WORKER_TIME_LIMIT = 300  # seconds
+WORKER_MAX_IDLE = WORKER_TIME_LIMIT - MAX_TIMEOUT - 5
+
+WORKER_CMD = (
+    *NSJAIL_BASE,
+    "--time_limit",
+    str(WORKER_TIME_LIMIT),
+    "--",
+    "/usr/bin/python3",
+    SANDBOX_WORKER,
+)
+
+
+class SandboxPool:
+    """Keeps a queue of nsjail + python3 processes that have already started
+    and are blocked reading their job from stdin.
+
+    Each worker runs exactly one job so no state leaks between users; a
+    replacement is spawned in the background as soon as one is taken, which
+    keeps the fork/exec and interpreter start-up off the request path.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._idle = collections.deque()
+        self._watchers = {}
+        self._refills = set()
+        self._busy = set()
+        self._closed = False
+
+    async def _spawn(self):
+        stdout, stderr = open_capture()
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *WORKER_CMD,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=stdout,
+                stderr=stderr,
+                pipesize=JOB_PIPE_SIZE,
+                **SPAWN_KWARGS,
+            )
+        except Exception:
+            stdout.close()
+            stderr.close()
+            raise
+        return process, stdout, stderr, asyncio.get_running_loop().time()
+
+    @staticmethod
+    async def _discard(worker):
+        process, stdout, stderr, _ = worker
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        stdout.close()
+        stderr.close()
+
+    def _add_idle(self, worker):
+        self._idle.append(worker)
+        self._watchers[worker] = asyncio.create_task(self._recycle(worker))
+
+    def _take_idle(self):
+        worker = self._idle.popleft()
+        self._watchers.pop(worker).cancel()
+        return worker
+
+    async def _recycle(self, worker):
+        """Replace an idle worker before nsjail's time limit reaps it, or as
+        soon as it dies on its own, so the queue never holds dead jails."""
+        process, _, _, spawned_at = worker
+        ttl = spawned_at + WORKER_MAX_IDLE - asyncio.get_running_loop().time()
+        try:
+            await asyncio.wait_for(process.wait(), max(ttl, 0))
+            # Died while idle; let traffic top the pool up rather than
+            # respawning in a tight loop if nsjail keeps failing
+            logger.warning("Idle sandbox worker exited with {}", process.returncode)
+            refill = False
+        except asyncio.TimeoutError:
+            refill = True
+        self._idle.remove(worker)
+        del self._watchers[worker]
+        await self._discard(worker)
+        if refill:
+            self._top_up()
+
+    async def _refill(self):
+        try:
+            self._add_idle(await self._spawn())
+        except Exception as e:
+            logger.error("Failed to spawn sandbox worker: {}", e)
+
+    def _schedule_refill(self):
+        if self._closed:
+            return
+        task = asyncio.create_task(self._refill())
+        self._refills.add(task)
+        task.add_done_callback(self._refills.discard)
+
+    def _top_up(self):
+        for _ in range(self.size - len(self._idle) - len(self._refills)):
+            self._schedule_refill()
+
+    async def _acquire(self, timeout: int):
+        """Take a live worker with enough of its nsjail time limit left to
+        run a job of `timeout` seconds."""
+        deadline = asyncio.get_running_loop().time() + timeout + 1
+        try:
+            while self._idle:
+                worker = self._take_idle()
+                process, _, _, spawned_at = worker
+                if process.returncode is None and (
+                    deadline - spawned_at < WORKER_TIME_LIMIT
+                ):
+                    return worker
+                await self._discard(worker)
+
+            # Pool drained by a burst, don't make the caller wait for a refill
+            return await self._spawn()
+        finally:
+            self._top_up()
+
+    async def start(self):
+        for _ in range(self.size):
+            await self._refill()
+        logger.info("Sandbox pool started with {} workers", len(self._idle))
+
+    async def close(self):
+        self._closed = True
+        refills = list(self._refills)
+        for task in refills:
+            task.cancel()
+        await asyncio.gather(*refills, return_exceptions=True)
+        while self._idle:
+            await self._discard(self._take_idle())
+        # In-flight jobs clean up their own files once their worker dies
+        for process, _, _, _ in list(self._busy):
+            if process.returncode is None:
+                process.kill()
+
+    @staticmethod
+    async def _feed(process, job: bytes):
+        try:
+            process.stdin.write(job)
+            await process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # worker already exited, its stderr tells why
+        process.stdin.close()
+        await process.wait()
+
+    async def run(self, code: str, timeout: int):
+        """Run `code` on a ready worker and return (stdout, stderr, exit_code)."""
+        # Encode first: a failure here must not strand a worker
+        job = f"{timeout}\n{code}".encode()
+
+        worker = await self._acquire(timeout)
+        process, stdout, stderr, _ = worker
+        self._busy.add(worker)
+        try:
+            try:
+                await asyncio.wait_for(self._feed(process, job), timeout + 1)
+            except asyncio.TimeoutError:
+                await self._discard(worker)
+                return "", "Execution timed out", -1
+
+            return read_output(stdout), read_output(stderr), process.returncode
+        except BaseException:
+            # Cancelled or failed mid-job: never leave the jail running
+            await self._discard(worker)
+            raise
+        finally:
+            self._busy.discard(worker)
+
+
+async def run_once(code: str, timeout: int):
+    """Run `code` in a fresh jail and return (stdout, stderr, exit_code)."""
+    # Encode first: a failure here must not leave any fd behind
+    job = code.encode()
+    nsjail_cmd = (
+        *NSJAIL_BASE,
+        "--time_limit",
+        str(timeout),
+        "--rlimit_cpu",
+        str(timeout),
+        "--",
+        "/usr/bin/python3",
+        "-",
+    )
+    logger.opt(lazy=True).debug("nsjail command: {}", lambda: " ".join(nsjail_cmd))
+
+    stdout, stderr = open_capture()
+    process = None
+    try:
+        # Hand the code to python3 on stdin from an anonymous in-memory file,
+        # so nothing touches the disk. (/proc is not mounted in the jail, so a
+        # /proc/self/fd path would not resolve.)
+        code_fd = os.memfd_create("code")
+        try:
+            os.write(code_fd, job)
+            os.lseek(code_fd, 0, os.SEEK_SET)
+            process = await asyncio.create_subprocess_exec(
+                *nsjail_cmd,
+                stdin=code_fd,
+                stdout=stdout,
+                stderr=stderr,
+                **SPAWN_KWARGS,
+            )
+        finally:
+            os.close(code_fd)
+
+        try:
+            await asyncio.wait_for(process.wait(), timeout + 1)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            stdout.close()
+            stderr.close()
+            return "", "Execution timed out", -1
+
+        return read_output(stdout), read_output(stderr), process.returncode
+    except BaseException:
+        # Cancelled or failed mid-job: never leave the jail running
+        if process is not None and process.returncode is None:
+            process.kill()
+            await process.wait()
+        stdout.close()
+        stderr.close()
+        raise
+
+
+sandbox_pool = SandboxPool(SANDBOX_POOL_SIZE)
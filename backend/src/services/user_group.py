@@ -2,57 +2,32 @@ import grp
 import pwd
 from src.settings import logger
 
+POSSIBLE_USERS = ("nobody", "www-data", "daemon", "nginx", "apache")
+POSSIBLE_GROUPS = ("nobody", "nogroup", "www-data", "daemon", "nginx", "apache")
 
-class UnprivilegedUserGroup:
-    def __init__(self):
-        self.possible_users = ["nobody", "www-data", "daemon", "nginx", "apache"]
-        self.possible_groups = [
-            "nobody",
-            "nogroup",
-            "www-data",
-            "daemon",
-            "nginx",
-            "apache",
-        ]
-        self.user, self.group = self._get_user_group()
-
-    def _get_user_group(self):
-        user = self._get_user()
-        group = self._get_group()
-
-        if not user or not group:
-            return "65534", "65534"
-        return user, group
-
-    def _get_user(self):
-        for username in self.possible_users:
-            try:
-                return pwd.getpwnam(username).pw_name
-            except KeyError:
-                continue
-        return None
-
-    def _get_group(self):
-        for groupname in self.possible_groups:
-            try:
-                return grp.getgrnam(groupname).gr_name
-            except KeyError:
-                continue
-        return None
-
-    def get_user(self):
-        return self.user
-
-    def get_group(self):
-        return self.group
+
+def _first_existing(names, lookup):
+    for name in names:
+        try:
+            return lookup(name)
+        except KeyError:
+            continue
+    return None
+
+
+def _resolve_user_group() -> tuple[str, str]:
+    user = _first_existing(POSSIBLE_USERS, lambda name: pwd.getpwnam(name).pw_name)
+    group = _first_existing(POSSIBLE_GROUPS, lambda name: grp.getgrnam(name).gr_name)
+
+    if not user or not group:
+        return "65534", "65534"
+    return user, group
 
 
 try:
-    unprivileged = UnprivilegedUserGroup()
-    UNPRIVILEGED_USER = unprivileged.get_user()
-    UNPRIVILEGED_GROUP = unprivileged.get_group()
+    UNPRIVILEGED_USER, UNPRIVILEGED_GROUP = _resolve_user_group()
 except Exception as e:
-    logger.error(f"Error finding unprivileged user/group: {e}")
+    logger.error("Error finding unprivileged user/group: {}", e)
     raise RuntimeError(
         "Failed to find unprivileged user/group. Please check your system configuration."
     )
@@ -4,6 +4,7 @@ from loguru import logger
 
 load_dotenv()
 
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 
 PG_USER = os.getenv("PG_USER")
 PG_PASSWORD = os.getenv("PG_PASSWORD")
@@ -11,3 +12,7 @@ PG_HOST = os.getenv("PG_HOST")
 PG_PORT = os.getenv("PG_PORT")
 PG_DATABASE = os.getenv("PG_DATABASE")
 DATABASE_URL = f"postgresql://{PG_USER}:{PG_PASSWORD}@{PG_HOST}:{PG_PORT}/{PG_DATABASE}"
+
+# Number of pre-warmed nsjail executors kept ready per API process.
+# Set to 0 to spawn a fresh sandbox for every request instead.
+SANDBOX_POOL_SIZE = int(os.getenv("SANDBOX_POOL_SIZE", 4))